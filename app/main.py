@@ -1,16 +1,49 @@
+import asyncio
+import functools
+import hashlib
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from typing import AsyncIterator
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from app.models.response_models import ATSScoreResponse, CoverLetterResponse, ATSResumeResponse
 from app.models.request_models import ResumeURLRequest, CoverLetterRequest
 from app.utils.file_processor import FileProcessor
 from app.utils.gemini_service import GeminiService
+from app.utils.heuristics import looks_like_job_description, looks_like_resume
+from app.utils.llm_cache import LLMCache
 from app.utils.url_downloader import URLDownloader
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 # Initialize services
 file_processor = FileProcessor()
 url_downloader = URLDownloader()
+llm_cache = LLMCache()
+# Extracted resume text keyed by file content hash, so a resume submitted to
+# several endpoints in a row is only parsed once
+resume_text_cache: TTLCache = TTLCache(
+    maxsize=settings.RESUME_TEXT_CACHE_MAX, ttl=settings.RESUME_TEXT_CACHE_TTL
+)
+
+DISCONNECT_POLL_INTERVAL = 0.5  # seconds between client disconnect checks
+
+# Fixed error details for the common rejection paths; exceptions are still created per raise
+_ERR_GEMINI_NOT_CONFIGURED = "Gemini API is not configured. Please set GEMINI_API_KEY in environment variables."
+_ERR_CLIENT_DISCONNECTED = "Client closed request"
+_ERR_INSUFFICIENT_TEXT = (
+    "Could not extract sufficient text from the resume file. "
+    "Please ensure the file is not corrupted."
+)
+_ERR_NOT_A_RESUME = (
+    "File does not look like a resume. Please make sure it includes your contact "
+    "details and standard sections such as experience, education, or skills."
+)
+_ERR_JOB_DESCRIPTION_TOO_SHORT = "Job description is too short. Please provide a detailed job description."
+_ERR_NOT_A_JOB_DESCRIPTION = "Job description does not look like a job posting. Please paste the full job description."
 gemini_service = None
 
 
@@ -19,13 +52,22 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
     global gemini_service
+    llm_cache.load()
     try:
         gemini_service = GeminiService()
     except ValueError as e:
-        print(f"Warning: {e}")
+        if settings.FAIL_FAST_ON_MISSING_KEY:
+            raise
+        logger.error("Gemini service is not available: %s", e)
     yield
-    # Shutdown (if needed)
-    pass
+    # Shutdown
+    await url_downloader.aclose()
+    try:
+        llm_cache.save()
+    except OSError as e:
+        logger.error("Could not save the LLM cache: %s", e)
+    if gemini_service:
+        await gemini_service.aclose()
 
 
 app = FastAPI(
@@ -37,16 +79,139 @@ app = FastAPI(
     ),
     version="1.2.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+if settings.CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["Authorization", "Content-Type"],
+        expose_headers=["X-Cache"],
+        max_age=600,  # Let browsers cache preflight responses for 10 minutes
+    )
+
+
+async def require_gemini() -> GeminiService:
+    """Dependency that provides the Gemini service, failing the request if it is not configured"""
+    if gemini_service is None:
+        raise HTTPException(
+            status_code=500,
+            detail=_ERR_GEMINI_NOT_CONFIGURED,
+        )
+    return gemini_service
+
+
+def cancel_on_disconnect(endpoint):
+    """
+    Decorator that cancels an endpoint once its client disconnects, so abandoned
+    requests stop downloading, parsing and spending Gemini tokens.
+    The endpoint must accept a `raw_request: Request` parameter.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        raw_request: Request = kwargs["raw_request"]
+        handler = asyncio.ensure_future(endpoint(*args, **kwargs))
+        try:
+            while True:
+                done, _ = await asyncio.wait({handler}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    return handler.result()
+                if await raw_request.is_disconnected():
+                    raise HTTPException(status_code=499, detail=_ERR_CLIENT_DISCONNECTED)
+        finally:
+            if not handler.done():
+                handler.cancel()
+
+    return wrapper
+
+
+async def _process_resume(file_content: bytes, filename: str) -> str:
+    """
+    Extract and validate the text of a downloaded resume file
+
+    Args:
+        file_content: Raw file bytes
+        filename: Name of the file, used to pick the parser
+
+    Returns:
+        Extracted resume text
+
+    Raises:
+        HTTPException: 400 if the text cannot be extracted or is too short
+    """
+    cache_key = f"{FileProcessor.classify(filename)}:{hashlib.blake2b(file_content, digest_size=16).hexdigest()}"
+    resume_text = resume_text_cache.get(cache_key)
+    if resume_text is None:
+        # Extract text from file in a worker thread so parsing doesn't block the event loop
+        try:
+            resume_text = await asyncio.to_thread(FileProcessor.extract_text, file_content, filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        resume_text_cache[cache_key] = resume_text
+
+    if not resume_text or len(resume_text.strip()) < 50:
+        raise HTTPException(
+            status_code=400,
+            detail=_ERR_INSUFFICIENT_TEXT,
+        )
+
+    # Reject files that are clearly not resumes before paying for a Gemini call
+    if not looks_like_resume(resume_text):
+        raise HTTPException(
+            status_code=400,
+            detail=_ERR_NOT_A_RESUME,
+        )
+
+    return resume_text
+
+
+def _validate_job_description(job_description: str) -> None:
+    """
+    Reject job descriptions that are too short or filler
+
+    Raises:
+        HTTPException: 400 if the job description is unusable
+    """
+    if not job_description or len(job_description.strip()) < 30:
+        raise HTTPException(
+            status_code=400,
+            detail=_ERR_JOB_DESCRIPTION_TOO_SHORT,
+        )
+
+    if not looks_like_job_description(job_description):
+        raise HTTPException(
+            status_code=400,
+            detail=_ERR_NOT_A_JOB_DESCRIPTION,
+        )
+
+
+async def _stream_text_response(chunks: AsyncIterator[str], error_prefix: str) -> StreamingResponse:
+    """
+    Wrap a Gemini text stream in a plain-text StreamingResponse
+
+    The first chunk is awaited before the response starts, so failures that happen
+    before any text is produced are still reported as a regular HTTP error.
+
+    Raises:
+        HTTPException: 500 if Gemini fails before producing any text
+    """
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail=f"{error_prefix}: Gemini returned an empty response")
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"{error_prefix}: {str(e)}")
+
+    async def body() -> AsyncIterator[str]:
+        yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
 
 
 @app.get("/")
@@ -69,50 +234,48 @@ async def health_check():
 
 
 @app.post("/resume_ats_score", response_model=ATSScoreResponse)
-async def resume_ats_score(request: ResumeURLRequest):
+@cancel_on_disconnect
+async def resume_ats_score(
+    request: ResumeURLRequest,
+    raw_request: Request,
+    response: Response,
+    gemini: GeminiService = Depends(require_gemini),
+):
     """
     Evaluate a resume file from URL and return ATS compatibility score
     
     Args:
         request: ResumeURLRequest with resume_url (URL to doc, docx, or pdf file)
+        raw_request: Incoming HTTP request, used to stop work if the client disconnects
         
     Returns:
         ATSScoreResponse with score, feedback, strengths, weaknesses, and recommendations
     """
-    # Validate Gemini service is configured
-    if not gemini_service:
-        raise HTTPException(
-            status_code=500,
-            detail="Gemini API is not configured. Please set GEMINI_API_KEY in environment variables."
-        )
-    
     try:
         # Download file from URL
         file_content, filename = await url_downloader.download_file(str(request.resume_url))
         
-        # Extract text from file
-        try:
-            resume_text = FileProcessor.extract_text(file_content, filename)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        
-        if not resume_text or len(resume_text.strip()) < 50:
-            raise HTTPException(
-                status_code=400,
-                detail="Could not extract sufficient text from the resume file. Please ensure the file is not corrupted."
-            )
+        resume_text = await _process_resume(file_content, filename)
         
-        # Analyze resume with Gemini Pro
-        try:
-            analysis_result = gemini_service.analyze_resume_for_ats(resume_text)
-        except ValueError as e:
-            raise HTTPException(status_code=500, detail=f"Error analyzing resume: {str(e)}")
+        # Analyze resume with Gemini Pro, reusing a cached analysis of identical text
+        cache_key = LLMCache.make_key("analyze_resume_for_ats", resume_text)
+        analysis_result = await llm_cache.get(cache_key)
+        response.headers["X-Cache"] = "MISS" if analysis_result is None else "HIT"
+        if analysis_result is None:
+            try:
+                if settings.ATS_BATCH_WINDOW_MS > 0:
+                    analysis_result = await gemini.analyze_resume_for_ats_batched(resume_text)
+                else:
+                    analysis_result = await gemini.analyze_resume_for_ats_async(resume_text)
+            except ValueError as e:
+                raise HTTPException(status_code=500, detail=f"Error analyzing resume: {str(e)}")
+            await llm_cache.set(cache_key, analysis_result)
         
         # Get file type
-        file_type = FileProcessor.get_file_type(filename)
+        file_type = FileProcessor.classify(filename)
         
-        # Return response
-        return ATSScoreResponse(
+        # Return response; GeminiService already normalized the fields, so skip re-validation
+        return ATSScoreResponse.model_construct(
             score=analysis_result["score"],
             feedback=analysis_result["feedback"],
             strengths=analysis_result["strengths"],
@@ -133,55 +296,45 @@ async def resume_ats_score(request: ResumeURLRequest):
 
 
 @app.post("/cover_letter_generator", response_model=CoverLetterResponse)
-async def cover_letter_generator(request: CoverLetterRequest):
+@cancel_on_disconnect
+async def cover_letter_generator(
+    request: CoverLetterRequest,
+    raw_request: Request,
+    response: Response,
+    gemini: GeminiService = Depends(require_gemini),
+):
     """
     Generate a customized cover letter based on job description and resume.
 
     Args:
         request: CoverLetterRequest with resume_url and job_description
+        raw_request: Incoming HTTP request, used to stop work if the client disconnects
 
     Returns:
         CoverLetterResponse with generated cover letter and metadata.
     """
-    if not gemini_service:
-        raise HTTPException(
-            status_code=500,
-            detail="Gemini API is not configured. Please set GEMINI_API_KEY in environment variables.",
-        )
-
     try:
+        # Validate the job description first; it needs neither the download nor Gemini
+        _validate_job_description(request.job_description)
+
         # Download file from URL
         file_content, filename = await url_downloader.download_file(str(request.resume_url))
 
-        # Extract text from file
-        try:
-            resume_text = FileProcessor.extract_text(file_content, filename)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-
-        if not resume_text or len(resume_text.strip()) < 50:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    "Could not extract sufficient text from the resume file. "
-                    "Please ensure the file is not corrupted."
-                ),
-            )
-
-        if not request.job_description or len(request.job_description.strip()) < 30:
-            raise HTTPException(
-                status_code=400,
-                detail="Job description is too short. Please provide a detailed job description.",
-            )
-
-        try:
-            result = gemini_service.generate_cover_letter(
-                resume_text=resume_text, job_description=request.job_description
-            )
-        except ValueError as e:
-            raise HTTPException(status_code=500, detail=f"Error generating cover letter: {str(e)}")
-
-        return CoverLetterResponse(
+        resume_text = await _process_resume(file_content, filename)
+
+        cache_key = LLMCache.make_key("generate_cover_letter", resume_text, request.job_description)
+        result = await llm_cache.get(cache_key)
+        response.headers["X-Cache"] = "MISS" if result is None else "HIT"
+        if result is None:
+            try:
+                result = await gemini.generate_cover_letter_async(
+                    resume_text=resume_text, job_description=request.job_description
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=500, detail=f"Error generating cover letter: {str(e)}")
+            await llm_cache.set(cache_key, result)
+
+        return CoverLetterResponse.model_construct(
             cover_letter=result["cover_letter"],
             model_used=result["model_used"],
             job_title=result.get("job_title") or None,
@@ -201,50 +354,125 @@ async def cover_letter_generator(request: CoverLetterRequest):
 
 
 @app.post("/ats_resume_generator", response_model=ATSResumeResponse)
-async def ats_resume_generator(request: ResumeURLRequest):
+@cancel_on_disconnect
+async def ats_resume_generator(
+    request: ResumeURLRequest,
+    raw_request: Request,
+    response: Response,
+    gemini: GeminiService = Depends(require_gemini),
+):
     """
     Regenerate a resume to be ATS-friendly and better structured.
 
     Args:
         request: ResumeURLRequest with resume_url (URL to pdf, doc, or docx file)
+        raw_request: Incoming HTTP request, used to stop work if the client disconnects
 
     Returns:
         ATSResumeResponse with regenerated resume text and metadata.
     """
-    if not gemini_service:
+    try:
+        # Download file from URL
+        file_content, filename = await url_downloader.download_file(str(request.resume_url))
+
+        resume_text = await _process_resume(file_content, filename)
+
+        cache_key = LLMCache.make_key("generate_ats_optimized_resume", resume_text)
+        result = await llm_cache.get(cache_key)
+        response.headers["X-Cache"] = "MISS" if result is None else "HIT"
+        if result is None:
+            try:
+                result = await gemini.generate_ats_optimized_resume_async(resume_text=resume_text)
+            except ValueError as e:
+                raise HTTPException(status_code=500, detail=f"Error regenerating resume: {str(e)}")
+            await llm_cache.set(cache_key, result)
+
+        return ATSResumeResponse.model_construct(
+            regenerated_resume=result["regenerated_resume"],
+            model_used=result["model_used"],
+            notes=result.get("notes") or None,
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail="Gemini API is not configured. Please set GEMINI_API_KEY in environment variables.",
+            detail=f"An unexpected error occurred while regenerating resume: {str(e)}",
         )
 
+
+@app.post("/cover_letter_generator/stream", response_class=StreamingResponse)
+@cancel_on_disconnect
+async def cover_letter_generator_stream(
+    request: CoverLetterRequest,
+    raw_request: Request,
+    gemini: GeminiService = Depends(require_gemini),
+):
+    """
+    Stream a customized cover letter as plain text while it is being generated.
+
+    Args:
+        request: CoverLetterRequest with resume_url and job_description
+        raw_request: Incoming HTTP request, used to stop work if the client disconnects
+
+    Returns:
+        StreamingResponse with the cover letter text.
+    """
     try:
+        _validate_job_description(request.job_description)
+
         # Download file from URL
         file_content, filename = await url_downloader.download_file(str(request.resume_url))
 
-        # Extract text from file
-        try:
-            resume_text = FileProcessor.extract_text(file_content, filename)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        resume_text = await _process_resume(file_content, filename)
 
-        if not resume_text or len(resume_text.strip()) < 50:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    "Could not extract sufficient text from the resume file. "
-                    "Please ensure the file is not corrupted."
-                ),
-            )
+        return await _stream_text_response(
+            gemini.generate_cover_letter_stream(
+                resume_text=resume_text, job_description=request.job_description
+            ),
+            error_prefix="Error generating cover letter",
+        )
 
-        try:
-            result = gemini_service.generate_ats_optimized_resume(resume_text=resume_text)
-        except ValueError as e:
-            raise HTTPException(status_code=500, detail=f"Error regenerating resume: {str(e)}")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred while generating cover letter: {str(e)}",
+        )
 
-        return ATSResumeResponse(
-            regenerated_resume=result["regenerated_resume"],
-            model_used=result["model_used"],
-            notes=result.get("notes") or None,
+
+@app.post("/ats_resume_generator/stream", response_class=StreamingResponse)
+@cancel_on_disconnect
+async def ats_resume_generator_stream(
+    request: ResumeURLRequest,
+    raw_request: Request,
+    gemini: GeminiService = Depends(require_gemini),
+):
+    """
+    Stream an ATS-optimized version of the resume as plain text while it is being generated.
+
+    Args:
+        request: ResumeURLRequest with resume_url (URL to pdf, doc, or docx file)
+        raw_request: Incoming HTTP request, used to stop work if the client disconnects
+
+    Returns:
+        StreamingResponse with the regenerated resume text.
+    """
+    try:
+        # Download file from URL
+        file_content, filename = await url_downloader.download_file(str(request.resume_url))
+
+        resume_text = await _process_resume(file_content, filename)
+
+        return await _stream_text_response(
+            gemini.generate_ats_optimized_resume_stream(resume_text=resume_text),
+            error_prefix="Error regenerating resume",
         )
 
     except HTTPException:
@@ -256,4 +484,3 @@ async def ats_resume_generator(request: ResumeURLRequest):
             status_code=500,
             detail=f"An unexpected error occurred while regenerating resume: {str(e)}",
         )
-
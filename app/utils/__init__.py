@@ -1,6 +1,15 @@
 from .file_processor import FileProcessor
 from .gemini_service import GeminiService
+from .heuristics import looks_like_job_description, looks_like_resume
+from .llm_cache import LLMCache
 from .url_downloader import URLDownloader
 
-__all__ = ["FileProcessor", "GeminiService", "URLDownloader"]
+__all__ = [
+    "FileProcessor",
+    "GeminiService",
+    "LLMCache",
+    "URLDownloader",
+    "looks_like_job_description",
+    "looks_like_resume",
+]
 
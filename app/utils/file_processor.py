@@ -1,42 +1,86 @@
 import io
+import os
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
 from typing import Optional
-from docx import Document
-import PyPDF2
+import pypdfium2 as pdfium
+
+
+# WordprocessingML tags needed to rebuild paragraph text from word/document.xml
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_PARAGRAPH = f"{_W_NS}p"
+_W_RUN = f"{_W_NS}r"
+_W_TEXT = f"{_W_NS}t"
+_W_TAB = f"{_W_NS}tab"
+_W_BREAKS = {f"{_W_NS}br", f"{_W_NS}cr"}
+# Word stores text boxes twice, as a modern mc:Choice and a legacy VML mc:Fallback copy
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+# PDFium is not thread-safe: its functions must never run concurrently, even on
+# different documents, and ctypes releases the GIL while they run
+_PDFIUM_LOCK = threading.Lock()
 
 
 class FileProcessor:
     """Utility class for processing resume files"""
     
-    ALLOWED_EXTENSIONS = {".doc", ".docx", ".pdf"}
+    FILE_TYPES = {".pdf": "pdf", ".docx": "docx", ".doc": "doc"}  # Extension -> file type
+    EXTENSIONS = {file_type: extension for extension, file_type in FILE_TYPES.items()}
+    ALLOWED_EXTENSIONS = frozenset(FILE_TYPES)  # For membership checks; messages list FILE_TYPES in order
+    # Leading bytes of each allowed format (DOCX is a ZIP archive, DOC an OLE2 compound file)
+    SIGNATURES = (
+        (b"%PDF-", "pdf"),
+        (b"PK\x03\x04", "docx"),
+        (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc"),
+    )
+    SIGNATURE_LENGTH = max(len(signature) for signature, _ in SIGNATURES)
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     
+    @staticmethod
+    def classify(filename: str) -> Optional[str]:
+        """Get file type from filename, or None if the extension is not allowed"""
+        return FileProcessor.FILE_TYPES.get(os.path.splitext(filename)[1].lower())
+    
+    @staticmethod
+    def sniff_file_type(head: bytes) -> Optional[str]:
+        """Get file type from the first bytes of a file, or None if no allowed format matches"""
+        for signature, file_type in FileProcessor.SIGNATURES:
+            if head.startswith(signature):
+                return file_type
+        return None
+    
     @staticmethod
     def is_valid_extension(filename: str) -> bool:
         """Check if file has a valid extension"""
-        return any(filename.lower().endswith(ext) for ext in FileProcessor.ALLOWED_EXTENSIONS)
+        return FileProcessor.classify(filename) is not None
     
     @staticmethod
     def get_file_type(filename: str) -> str:
         """Get file type from filename"""
-        filename_lower = filename.lower()
-        if filename_lower.endswith(".pdf"):
-            return "pdf"
-        elif filename_lower.endswith(".docx"):
-            return "docx"
-        elif filename_lower.endswith(".doc"):
-            return "doc"
-        return "unknown"
+        return FileProcessor.classify(filename) or "unknown"
     
     @staticmethod
     def extract_text_from_pdf(file_content: bytes) -> str:
         """Extract text from PDF file"""
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            # PDFium parses and extracts text in native code; close pages and
+            # the document explicitly so their memory is released right away
+            with _PDFIUM_LOCK:
+                pdf = pdfium.PdfDocument(file_content)
+                try:
+                    pages_text = []
+                    for page in pdf:
+                        text_page = page.get_textpage()
+                        text = text_page.get_text_range()
+                        if text:  # Skip image-only/blank pages instead of emitting empty lines
+                            pages_text.append(text)
+                        text_page.close()
+                        page.close()
+                finally:
+                    pdf.close()
+            # PDFium ends lines with \r\n; normalize so line-based parsing works downstream
+            return "\n".join(pages_text).replace("\r\n", "\n").strip()
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF: {str(e)}")
     
@@ -44,10 +88,46 @@ class FileProcessor:
     def extract_text_from_docx(file_content: bytes) -> str:
         """Extract text from DOCX file"""
         try:
-            doc_file = io.BytesIO(file_content)
-            doc = Document(doc_file)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text.strip()
+            # Stream the main document part instead of building a full python-docx
+            # object graph (styles, numbering, sections) just to read its text
+            paragraphs = []
+            # Runs of each open paragraph; a text box paragraph nests inside its anchor's
+            open_paragraphs = []
+            run_depth = 0
+            fallback_depth = 0
+            with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+                with archive.open("word/document.xml") as document_xml:
+                    for event, element in ET.iterparse(document_xml, events=("start", "end")):
+                        tag = element.tag
+                        if tag == _MC_FALLBACK:
+                            fallback_depth += 1 if event == "start" else -1
+                            continue
+                        if fallback_depth:  # Skip the duplicate legacy copy
+                            continue
+                        if tag == _W_RUN:
+                            run_depth += 1 if event == "start" else -1
+                            continue
+                        if tag == _W_PARAGRAPH:
+                            if event == "start":
+                                open_paragraphs.append([])
+                            else:
+                                paragraphs.append("".join(open_paragraphs.pop()))
+                                element.clear()
+                            continue
+                        if event == "start" or not open_paragraphs:
+                            continue
+                        runs = open_paragraphs[-1]
+                        if tag == _W_TEXT:
+                            if element.text:
+                                runs.append(element.text)
+                        elif tag == _W_TAB:
+                            # w:tab is also a tab-stop definition under w:pPr/w:tabs;
+                            # only a tab inside a run is an actual tab character
+                            if run_depth:
+                                runs.append("\t")
+                        elif tag in _W_BREAKS:
+                            runs.append("\n")
+            return "\n".join(paragraphs).strip()
         except Exception as e:
             raise ValueError(f"Error extracting text from DOCX: {str(e)}")
     
@@ -64,7 +144,7 @@ class FileProcessor:
     @staticmethod
     def extract_text(file_content: bytes, filename: str) -> str:
         """Extract text from resume file based on file type"""
-        file_type = FileProcessor.get_file_type(filename)
+        file_type = FileProcessor.classify(filename)
         
         if file_type == "pdf":
             return FileProcessor.extract_text_from_pdf(file_content)
@@ -73,5 +153,5 @@ class FileProcessor:
         elif file_type == "doc":
             return FileProcessor.extract_text_from_doc(file_content)
         else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+            raise ValueError(f"Unsupported file type: {filename}")
 
@@ -1,11 +1,252 @@
+import asyncio
+import functools
 import google.generativeai as genai
-import json
+import orjson
 import re
-import hashlib
-from typing import Dict, Any
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    InvalidArgument,
+    PermissionDenied,
+    ResourceExhausted,
+    ServiceUnavailable,
+    Unauthenticated,
+)
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
 from config import settings
 
 
+# Response schemas for Gemini's JSON mode, so replies parse without any cleanup
+_ATS_RESULT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {"type": "NUMBER", "description": "ATS compatibility score between 0 and 100"},
+        "feedback": {
+            "type": "STRING",
+            "description": "Detailed feedback about the resume's ATS compatibility",
+        },
+        "strengths": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "weaknesses": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "recommendations": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["score", "feedback", "strengths", "weaknesses", "recommendations"],
+}
+
+_COVER_LETTER_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "cover_letter": {"type": "STRING", "description": "Full cover letter text"},
+        "job_title": {
+            "type": "STRING",
+            "description": "Detected or inferred job title, or empty string if unknown",
+        },
+        "company_name": {
+            "type": "STRING",
+            "description": "Detected or inferred company name, or empty string if unknown",
+        },
+        "notes": {
+            "type": "STRING",
+            "description": "Optional notes or suggestions for the candidate, can be empty",
+        },
+    },
+    "required": ["cover_letter", "job_title", "company_name", "notes"],
+}
+
+_ATS_RESUME_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "regenerated_resume": {
+            "type": "STRING",
+            "description": "Regenerated resume (or resume section) in plain text, with clear section headings",
+        },
+        "notes": {
+            "type": "STRING",
+            "description": "Brief explanation of the key improvements made, or empty string",
+        },
+    },
+    "required": ["regenerated_resume", "notes"],
+}
+
+
+def _json_config(schema: Dict[str, Any]) -> genai.GenerationConfig:
+    """Generation config asking Gemini for JSON that matches schema"""
+    return genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+
+_ATS_CONFIG = _json_config(_ATS_RESULT_SCHEMA)
+_ATS_BATCH_CONFIG = _json_config({"type": "ARRAY", "items": _ATS_RESULT_SCHEMA})
+_COVER_LETTER_CONFIG = _json_config(_COVER_LETTER_SCHEMA)
+_ATS_RESUME_CONFIG = _json_config(_ATS_RESUME_SCHEMA)
+
+# Section headings long resumes are split on; text before the first one is
+# the candidate's contact details and is kept verbatim
+_SECTION_HEADER_RE = re.compile(
+    r"^[ \t]*(summary|experience|education|skills|projects)[ \t]*:?[ \t]*\r?$",
+    re.MULTILINE | re.IGNORECASE,
+)
+_PERSONAL_DETAILS = "personal_details"
+
+# Rate limits and server hiccups usually clear within seconds, so the same model is
+# retried with backoff before falling back to the next one
+_TRANSIENT_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError)
+# A bad key or malformed request fails the same way on every model
+_FATAL_ERRORS = (PermissionDenied, Unauthenticated, InvalidArgument)
+
+_retry_transient = retry(
+    retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+    wait=wait_exponential_jitter(
+        initial=settings.GEMINI_RETRY_INITIAL_WAIT, max=settings.GEMINI_RETRY_MAX_WAIT
+    ),
+    stop=stop_after_attempt(settings.GEMINI_RETRY_ATTEMPTS),
+    reraise=True,
+)
+
+
+@_retry_transient
+async def _generate(model: genai.GenerativeModel, prompt: str, **kwargs: Any) -> Any:
+    """Call model.generate_content_async, retrying transient errors"""
+    return await model.generate_content_async(prompt, **kwargs)
+
+
+def _fatal_error_message(error: Exception, purpose: str = "") -> str:
+    """Describe an error that no other model would avoid, hinting at the likely fix"""
+    if isinstance(error, InvalidArgument):
+        # Also raised for oversized prompts and schema/config problems, not just bad keys
+        return f"Gemini rejected the request{purpose}: {str(error)}"
+    return f"Error calling Gemini API{purpose}: {str(error)}. Please check your API key permissions."
+
+
+# Shared by the single and batched ATS prompts so both score resumes the same way
+_ATS_CRITERIA = """Consider the following ATS evaluation criteria:
+1. Keyword optimization and relevance
+2. Formatting and structure (ATS-friendly formatting)
+3. Section completeness (contact info, work experience, education, skills)
+4. Use of standard section headers
+5. File format compatibility
+6. Absence of graphics/images that ATS can't read
+7. Proper use of dates and formatting
+8. Quantifiable achievements and metrics
+9. Industry-specific keywords
+10. Overall readability and parsing by ATS systems
+
+Provide a score from 0-100 where:
+- 90-100: Excellent ATS compatibility
+- 70-89: Good ATS compatibility with minor improvements needed
+- 50-69: Fair ATS compatibility, significant improvements recommended
+- 0-49: Poor ATS compatibility, major overhaul needed"""
+
+# Shared by the JSON and streaming variants of the generators
+_COVER_LETTER_INSTRUCTIONS = """You are an expert career coach and professional cover letter writer.
+
+Use the candidate resume and job description given at the end of this message to write a highly
+tailored, ATS-friendly, and compelling cover letter that the candidate can use to apply for this
+specific role.
+
+Write a personalized cover letter that:
+- Clearly aligns the candidate's experience with the job requirements
+- Highlights 3–5 key achievements that match the role
+- Uses a professional but warm tone
+- Is concise (around 350–500 words)
+- Avoids repeating the resume verbatim
+- Avoids making up fake companies or roles"""
+
+_RESUME_REWRITE_INSTRUCTIONS = """You are an expert resume writer and ATS optimization specialist.
+
+Take the resume content given at the end of this message and regenerate it to:
+- Improve clarity, structure, and readability
+- Use standard ATS-friendly section headings (e.g., SUMMARY, EXPERIENCE, EDUCATION, SKILLS)
+- Avoid complex tables, columns, images, and graphics
+- Use bullet points where appropriate
+- Emphasize quantified achievements and relevant keywords
+- Keep the content truthful and do NOT invent new experience or companies
+- Preserve all important information from the original resume"""
+
+# Prompt templates, filled in with str.format. Static instructions come first and the
+# resume last, so requests share a common prefix; that only enables Gemini's implicit
+# caching if the prefix grows past its minimum size (1024+ tokens), which these don't
+# reach yet. The JSON reply format comes from the response schemas.
+_ATS_PROMPT_TMPL = """You are an expert ATS (Applicant Tracking System) resume analyzer.
+Analyze the resume given at the end of this message and provide a comprehensive evaluation.
+
+""" + _ATS_CRITERIA + """
+
+Resume Text:
+{resume_text}"""
+
+_ATS_BATCH_PROMPT_TMPL = """You are an expert ATS (Applicant Tracking System) resume analyzer.
+Analyze each of the resumes given at the end of this message independently and provide a
+comprehensive evaluation of each one, with exactly one evaluation per resume, in the same
+order as the resumes.
+
+""" + _ATS_CRITERIA + """
+
+There are {count} resumes:
+
+{resumes}"""
+
+_COVER_PROMPT_TMPL = _COVER_LETTER_INSTRUCTIONS + """
+
+Try to infer the job title and company name from the job description if possible.
+
+--- RESUME ---
+{resume_text}
+
+--- JOB DESCRIPTION ---
+{job_description}"""
+
+_COVER_STREAM_PROMPT_TMPL = _COVER_LETTER_INSTRUCTIONS + """
+
+Respond with the cover letter text only, in plain text, without JSON or markdown formatting.
+
+--- RESUME ---
+{resume_text}
+
+--- JOB DESCRIPTION ---
+{job_description}"""
+
+_REGEN_PROMPT_TMPL = _RESUME_REWRITE_INSTRUCTIONS + """
+
+--- ORIGINAL RESUME ---
+{resume_text}"""
+
+_REGEN_SECTION_PROMPT_TMPL = _RESUME_REWRITE_INSTRUCTIONS + """
+
+The content is a single section of a longer resume. Rewrite only this section, keeping its
+heading, and do not add other sections or contact details.
+
+--- RESUME SECTION ---
+{section_text}"""
+
+_REGEN_STREAM_PROMPT_TMPL = _RESUME_REWRITE_INSTRUCTIONS + """
+
+Respond with the full regenerated resume only, in plain text with clear section headings,
+without JSON or markdown formatting.
+
+--- ORIGINAL RESUME ---
+{resume_text}"""
+
+
+@functools.lru_cache(maxsize=1)
+def _discover_available_models() -> Optional[Tuple[str, ...]]:
+    """
+    List the Gemini models that support generateContent for the configured API key.
+    Cached for the life of the process, so the list_models round trip happens at most once.
+    Call after genai.configure().
+
+    Returns:
+        Model names (without the "models/" prefix) in API order, or None if listing failed
+    """
+    try:
+        return tuple(
+            model.name.split('/')[-1]
+            for model in genai.list_models()
+            if 'generateContent' in model.supported_generation_methods
+        )
+    except Exception:
+        return None
+
+
 class GeminiService:
     """Service for interacting with Google Gemini Pro API"""
     
@@ -25,16 +266,10 @@ class GeminiService:
             "gemini-2.0-flash",         # Alternative option
         ]
         
-        # Try to get available models and filter to only those that support generateContent
-        try:
-            all_models = genai.list_models()
-            available_model_names = []
-            for model in all_models:
-                model_name = model.name.split('/')[-1]
-                # Check if model supports generateContent
-                if 'generateContent' in model.supported_generation_methods:
-                    available_model_names.append(model_name)
-            
+        # Filter to available models that support generateContent
+        # (if listing models fails, use our default list)
+        available_model_names = _discover_available_models()
+        if available_model_names is not None:
             # Filter our preferred list to only include available models
             self.model_names = [
                 name for name in self.model_names 
@@ -43,331 +278,487 @@ class GeminiService:
             
             # If none of our preferred models are available, use any available model
             if not self.model_names and available_model_names:
-                self.model_names = available_model_names[:5]  # Take first 5 available
-        except Exception:
-            # If listing models fails, use our default list
-            pass
+                self.model_names = list(available_model_names[:5])  # Take first 5 available
         
         if not self.model_names:
             raise ValueError(
                 "No Gemini models available. Please check your API key permissions."
             )
         
+        # Build every model once; the fallback loops index into this list
+        self._models = [genai.GenerativeModel(name) for name in self.model_names]
+        
         # Initialize with first model name (will be tried during first API call)
-        self.model = genai.GenerativeModel(self.model_names[0])
+        self.model = self._models[0]
         self.current_model_index = 0
         
-        # Cache for ATS scores - keyed by resume content hash
-        self.ats_score_cache: Dict[str, Dict[str, Any]] = {}
+        # Queue and background task that coalesce concurrent ATS analyses,
+        # created lazily on the first batched call (needs a running event loop)
+        self._ats_queue: Optional[asyncio.Queue] = None
+        self._ats_batcher: Optional[asyncio.Task] = None
+        # Batches currently waiting on Gemini, at most GEMINI_MAX_CONCURRENCY at a time
+        self._ats_batches: Set[asyncio.Task] = set()
+        self._ats_batch_slots: Optional[asyncio.Semaphore] = None
     
-    def _get_resume_hash(self, resume_text: str) -> str:
+    def _fallback_order(self) -> List[int]:
+        """Model indices to try: the last model that worked first, then the rest in preference order"""
+        return [self.current_model_index] + [
+            i for i in range(len(self.model_names)) if i != self.current_model_index
+        ]
+    
+    def _use_model(self, index: int) -> None:
+        """Remember the model that last answered so the next call tries it first"""
+        self.model = self._models[index]
+        self.current_model_index = index
+    
+    async def _call_with_fallback(
+        self,
+        prompt: str,
+        purpose: str = "",
+        generation_config: Optional[genai.GenerationConfig] = None,
+    ) -> Tuple[Any, str]:
         """
-        Generate a hash for the resume text to use as cache key
+        Send a prompt to Gemini, falling back to the next model in self.model_names on errors.
+        Transient errors (rate limits, 5xx, timeouts) are first retried on the same model.
         
         Args:
-            resume_text: Resume text content
+            prompt: Prompt to send
+            purpose: Optional suffix for the error message (e.g. " for cover letter")
+            generation_config: Optional generation config (e.g. JSON mode with a response schema)
             
         Returns:
-            SHA256 hash of the normalized resume text
+            Tuple of (Gemini response object, name of the model that produced it)
+            
+        Raises:
+            ValueError: If every model fails, or on an error no other model would avoid (e.g. a bad API key)
         """
-        # Normalize the text (strip whitespace, lowercase) for consistent hashing
-        normalized_text = resume_text.strip().lower()
-        return hashlib.sha256(normalized_text.encode('utf-8')).hexdigest()
+        order = self._fallback_order()
+        for attempt, i in enumerate(order):
+            model = self._models[i]
+            try:
+                response = await _generate(model, prompt, generation_config=generation_config)
+            except _FATAL_ERRORS as e:
+                raise ValueError(_fatal_error_message(e, purpose))
+            except Exception as e:
+                # If this is the last model, raise error
+                if attempt == len(order) - 1:
+                    raise ValueError(
+                        f"Error calling Gemini API{purpose}: {str(e)}. "
+                        f"Tried models: {', '.join(self.model_names)}. "
+                        f"Please check your API key permissions."
+                    )
+                continue
+            self._use_model(i)
+            return response, self.model_names[i]
+    
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Get the text of a Gemini response, handling both old and new API response formats"""
+        if hasattr(response, "text"):
+            return response.text.strip()
+        elif hasattr(response, "candidates") and response.candidates:
+            return response.candidates[0].content.parts[0].text.strip()
+        return str(response).strip()
     
-    def analyze_resume_for_ats(self, resume_text: str) -> Dict[str, Any]:
+    def _parse_json(self, response: Any, purpose: str = "") -> Any:
+        """Parse the body of a Gemini JSON-mode response"""
+        try:
+            # JSON mode returns bare JSON, so the text parses as is
+            return orjson.loads(self._response_text(response))
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse Gemini response{purpose} as JSON: {str(e)}")
+    
+    async def _generate_json(
+        self, prompt: str, generation_config: genai.GenerationConfig, purpose: str = ""
+    ) -> Tuple[Any, str]:
         """
-        Analyze resume text and generate ATS score with detailed feedback.
-        Results are cached based on resume content hash to ensure consistent scores.
+        Send a prompt to Gemini in JSON mode, with model fallback, and parse the reply
         
         Args:
-            resume_text: Extracted text from resume file
+            prompt: Prompt to send
+            generation_config: JSON-mode generation config holding the response schema
+            purpose: Optional suffix for error messages (e.g. " for cover letter")
             
         Returns:
-            Dictionary containing score, feedback, strengths, weaknesses, and recommendations
+            Tuple of (parsed JSON, name of the model that produced it)
+            
+        Raises:
+            ValueError: If every model fails or the reply is not valid JSON
         """
-        # Check cache first
-        resume_hash = self._get_resume_hash(resume_text)
-        if resume_hash in self.ats_score_cache:
-            return self.ats_score_cache[resume_hash]
-        
-        prompt = f"""You are an expert ATS (Applicant Tracking System) resume analyzer. 
-Analyze the following resume and provide a comprehensive evaluation.
-
-Resume Text:
-{resume_text}
-
-Please provide your analysis in the following JSON format:
-{{
-    "score": <number between 0-100>,
-    "feedback": "<detailed feedback about the resume's ATS compatibility>",
-    "strengths": ["<strength1>", "<strength2>", ...],
-    "weaknesses": ["<weakness1>", "<weakness2>", ...],
-    "recommendations": ["<recommendation1>", "<recommendation2>", ...]
-}}
-
-Consider the following ATS evaluation criteria:
-1. Keyword optimization and relevance
-2. Formatting and structure (ATS-friendly formatting)
-3. Section completeness (contact info, work experience, education, skills)
-4. Use of standard section headers
-5. File format compatibility
-6. Absence of graphics/images that ATS can't read
-7. Proper use of dates and formatting
-8. Quantifiable achievements and metrics
-9. Industry-specific keywords
-10. Overall readability and parsing by ATS systems
-
-Provide a score from 0-100 where:
-- 90-100: Excellent ATS compatibility
-- 70-89: Good ATS compatibility with minor improvements needed
-- 50-69: Fair ATS compatibility, significant improvements recommended
-- 0-49: Poor ATS compatibility, major overhaul needed
-
-Respond ONLY with valid JSON, no additional text or markdown formatting."""
-
-        # Try models until one works
-        response = None
-        last_error = None
+        response, model_name = await self._call_with_fallback(prompt, purpose, generation_config)
+        return self._parse_json(response, purpose), model_name
+    
+    async def _stream_with_fallback(self, prompt: str, purpose: str = "") -> AsyncIterator[str]:
+        """
+        Stream the text of a Gemini response chunk by chunk, falling back to the next model
+        in self.model_names if a model fails before producing any text
         
-        for i in range(len(self.model_names)):
+        Args:
+            prompt: Prompt to send
+            purpose: Optional suffix for the error message (e.g. " for cover letter")
+            
+        Yields:
+            Response text chunks as Gemini produces them
+            
+        Raises:
+            ValueError: If every model fails, or the stream breaks after text was sent
+        """
+        order = self._fallback_order()
+        for attempt, i in enumerate(order):
+            model = self._models[i]
+            started = False
             try:
-                # Try current model or next one if previous failed
-                if i > 0:
-                    self.model = genai.GenerativeModel(self.model_names[i])
-                    self.current_model_index = i
-                
-                response = self.model.generate_content(prompt)
-                break  # Success, exit loop
+                response = await _generate(model, prompt, stream=True)
+                async for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:  # Chunk without text parts (e.g. the final one)
+                        continue
+                    if text:
+                        if not started:
+                            started = True
+                            self._use_model(i)
+                        yield text
+                return
             except Exception as e:
-                last_error = e
-                # If this is the last model, raise error
-                if i == len(self.model_names) - 1:
+                # Once text has been sent the caller can't switch models transparently
+                if started or attempt == len(order) - 1 or isinstance(e, _FATAL_ERRORS):
                     raise ValueError(
-                        f"Error calling Gemini API: {str(e)}. "
-                        f"Tried models: {', '.join(self.model_names)}. "
-                        f"Please check your API key permissions."
+                        f"Error streaming from Gemini API{purpose}: {str(e)}. "
+                        f"Tried models: {', '.join(self.model_names[j] for j in order[:attempt + 1])}."
                     )
-                continue
-        
-        if response is None:
-            raise ValueError(f"Failed to get response from any Gemini model. Last error: {str(last_error)}")
+    
+    @staticmethod
+    def _as_text(value: Any) -> str:
+        """Coerce a JSON value from Gemini into a string, joining lists line by line"""
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return "\n".join(str(item) for item in value)
+        return str(value)
+    
+    @staticmethod
+    def _as_text_list(value: Any) -> List[str]:
+        """Coerce a JSON value from Gemini into a list of strings"""
+        if not value:
+            return []
+        if isinstance(value, list):
+            return [str(item) for item in value]
+        return [str(value)]
+    
+    @staticmethod
+    def _normalize_ats_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Clamp the score and coerce every field of a parsed ATS analysis to the types of
+        ATSScoreResponse, so callers can build the response without re-validating it
+        """
+        score = float(result.get("score", 0))
+        score = max(0, min(100, score))  # Clamp between 0-100
         
+        return {
+            "score": round(score, 2),
+            "feedback": GeminiService._as_text(result.get("feedback")) or "No feedback provided",
+            "strengths": GeminiService._as_text_list(result.get("strengths")),
+            "weaknesses": GeminiService._as_text_list(result.get("weaknesses")),
+            "recommendations": GeminiService._as_text_list(result.get("recommendations"))
+        }
+    
+    def _validate_ats_result(self, result: Any) -> Dict[str, Any]:
+        """Validate and normalize a parsed Gemini ATS analysis"""
         try:
-            # Handle both old and new API response formats
-            if hasattr(response, 'text'):
-                response_text = response.text.strip()
-            elif hasattr(response, 'candidates') and response.candidates:
-                response_text = response.candidates[0].content.parts[0].text.strip()
-            else:
-                response_text = str(response).strip()
-            
-            # Clean the response to extract JSON
-            # Remove markdown code blocks if present
-            response_text = re.sub(r'```json\s*', '', response_text)
-            response_text = re.sub(r'```\s*', '', response_text)
-            response_text = response_text.strip()
-            
-            # Parse JSON response
-            result = json.loads(response_text)
-            
             # Validate and ensure score is within range
-            score = float(result.get("score", 0))
-            score = max(0, min(100, score))  # Clamp between 0-100
-            
-            analysis_result = {
-                "score": round(score, 2),
-                "feedback": result.get("feedback", "No feedback provided"),
-                "strengths": result.get("strengths", []),
-                "weaknesses": result.get("weaknesses", []),
-                "recommendations": result.get("recommendations", [])
-            }
-            
-            # Cache the result
-            self.ats_score_cache[resume_hash] = analysis_result
-            
-            return analysis_result
-            
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse Gemini response as JSON: {str(e)}")
+            return self._normalize_ats_result(result)
         except Exception as e:
             raise ValueError(f"Error processing Gemini response: {str(e)}")
-
-    def generate_cover_letter(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+    
+    async def analyze_resume_for_ats_async(self, resume_text: str) -> Dict[str, Any]:
         """
-        Generate a customized cover letter based on resume and job description.
-
+        Analyze resume text and generate ATS score with detailed feedback.
+        
+        Args:
+            resume_text: Extracted text from resume file
+            
         Returns:
-            Dict with cover_letter text and metadata.
+            Dictionary containing score, feedback, strengths, weaknesses, and recommendations
         """
-        prompt = f"""You are an expert career coach and professional cover letter writer.
-
-Use the following candidate resume and job description to write a highly tailored, ATS-friendly,
-and compelling cover letter that the candidate can use to apply for this specific role.
-
---- RESUME ---
-{resume_text}
+        result, _ = await self._generate_json(
+            _ATS_PROMPT_TMPL.format(resume_text=resume_text), _ATS_CONFIG
+        )
+        return self._validate_ats_result(result)
 
---- JOB DESCRIPTION ---
-{job_description}
+    def _validate_cover_letter_result(self, result: Any, model_name: str) -> Dict[str, Any]:
+        """Validate a parsed Gemini cover letter response"""
+        try:
+            cover_letter = self._as_text(result.get("cover_letter")).strip()
+            if not cover_letter:
+                raise ValueError("Gemini response did not contain a cover_letter field.")
 
-Write a personalized cover letter that:
-- Clearly aligns the candidate's experience with the job requirements
-- Highlights 3–5 key achievements that match the role
-- Uses a professional but warm tone
-- Is concise (around 350–500 words)
-- Avoids repeating the resume verbatim
-- Avoids making up fake companies or roles
+            return {
+                "cover_letter": cover_letter,
+                "model_used": model_name,
+                "job_title": self._as_text(result.get("job_title")),
+                "company_name": self._as_text(result.get("company_name")),
+                "notes": self._as_text(result.get("notes")),
+            }
 
-Try to infer the job title and company name from the job description if possible.
+        except Exception as e:
+            raise ValueError(f"Error processing Gemini cover letter response: {str(e)}")
 
-Return your answer in the following JSON format ONLY:
-{{
-  "cover_letter": "<full cover letter text>",
-  "job_title": "<detected or inferred job title, or empty string if unknown>",
-  "company_name": "<detected or inferred company name, or empty string if unknown>",
-  "notes": "<optional notes or suggestions for the candidate, can be empty>"
-}}"""
+    async def generate_cover_letter_async(self, resume_text: str, job_description: str) -> Dict[str, Any]:
+        """
+        Generate a customized cover letter based on resume and job description.
 
-        # Try models until one works
-        response = None
-        last_error = None
+        Returns:
+            Dict with cover_letter text and metadata.
+        """
+        result, model_name = await self._generate_json(
+            _COVER_PROMPT_TMPL.format(resume_text=resume_text, job_description=job_description),
+            _COVER_LETTER_CONFIG,
+            purpose=" for cover letter",
+        )
+        return self._validate_cover_letter_result(result, model_name)
+
+    @staticmethod
+    def _split_into_sections(resume_text: str) -> Dict[str, str]:
+        """
+        Split a resume on its standard section headings
 
-        for i in range(len(self.model_names)):
-            try:
-                if i > 0:
-                    self.model = genai.GenerativeModel(self.model_names[i])
-                    self.current_model_index = i
+        Args:
+            resume_text: Extracted resume text
 
-                response = self.model.generate_content(prompt)
-                break
-            except Exception as e:
-                last_error = e
-                if i == len(self.model_names) - 1:
-                    raise ValueError(
-                        f"Error calling Gemini API for cover letter: {str(e)}. "
-                        f"Tried models: {', '.join(self.model_names)}. "
-                        f"Please check your API key permissions."
-                    )
-                continue
+        Returns:
+            Section text (heading included) keyed by lowercase heading, in resume order.
+            Text before the first heading is returned under "personal_details".
+        """
+        sections: Dict[str, str] = {}
+        matches = list(_SECTION_HEADER_RE.finditer(resume_text))
+        preamble = resume_text[:matches[0].start()] if matches else resume_text
+        if preamble.strip():
+            sections[_PERSONAL_DETAILS] = preamble.strip()
+
+        for match, next_match in zip(matches, matches[1:] + [None]):
+            end = next_match.start() if next_match else len(resume_text)
+            text = resume_text[match.start():end].strip()
+            name = match.group(1).lower()
+            # A repeated heading (e.g. two EXPERIENCE blocks) joins the first one
+            sections[name] = f"{sections[name]}\n\n{text}" if name in sections else text
+        return sections
+
+    async def _generate_ats_optimized_resume_by_section(self, sections: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Regenerate a long resume with one Gemini call per section, all in parallel,
+        so no single call has to work through the whole resume
 
-        if response is None:
-            raise ValueError(f"Failed to get response from any Gemini model. Last error: {str(last_error)}")
+        Args:
+            sections: Resume sections as returned by _split_into_sections
 
+        Returns:
+            Dict with regenerated resume text and metadata.
+        """
+        personal_details = sections.pop(_PERSONAL_DETAILS, "")
+        replies = await asyncio.gather(*(
+            self._generate_json(
+                _REGEN_SECTION_PROMPT_TMPL.format(section_text=section_text),
+                _ATS_RESUME_CONFIG,
+                purpose=" for ATS resume generation",
+            )
+            for section_text in sections.values()
+        ))
+        results = [self._validate_ats_resume_result(result, model_name) for result, model_name in replies]
+
+        parts = [personal_details] if personal_details else []
+        parts.extend(result["regenerated_resume"] for result in results)
+        return {
+            "regenerated_resume": "\n\n".join(parts),
+            "model_used": ", ".join(dict.fromkeys(result["model_used"] for result in results)),
+            "notes": "\n".join(result["notes"] for result in results if result["notes"]),
+        }
+
+    def _validate_ats_resume_result(self, result: Any, model_name: str) -> Dict[str, Any]:
+        """Validate a parsed Gemini resume regeneration response"""
         try:
-            if hasattr(response, "text"):
-                response_text = response.text.strip()
-            elif hasattr(response, "candidates") and response.candidates:
-                response_text = response.candidates[0].content.parts[0].text.strip()
-            else:
-                response_text = str(response).strip()
-
-            response_text = re.sub(r"```json\s*", "", response_text)
-            response_text = re.sub(r"```\s*", "", response_text)
-            response_text = response_text.strip()
-
-            result = json.loads(response_text)
-
-            cover_letter = result.get("cover_letter", "").strip()
-            if not cover_letter:
-                raise ValueError("Gemini response did not contain a cover_letter field.")
+            regenerated_resume = self._as_text(result.get("regenerated_resume")).strip()
+            if not regenerated_resume:
+                raise ValueError("Gemini response did not contain a regenerated_resume field.")
 
             return {
-                "cover_letter": cover_letter,
-                "model_used": self.model_names[self.current_model_index],
-                "job_title": result.get("job_title") or "",
-                "company_name": result.get("company_name") or "",
-                "notes": result.get("notes") or "",
+                "regenerated_resume": regenerated_resume,
+                "model_used": model_name,
+                "notes": self._as_text(result.get("notes")),
             }
 
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse Gemini cover letter response as JSON: {str(e)}")
         except Exception as e:
-            raise ValueError(f"Error processing Gemini cover letter response: {str(e)}")
+            raise ValueError(f"Error processing Gemini ATS resume response: {str(e)}")
 
-    def generate_ats_optimized_resume(self, resume_text: str) -> Dict[str, Any]:
+    async def generate_ats_optimized_resume_async(self, resume_text: str) -> Dict[str, Any]:
         """
         Regenerate the resume to be ATS-optimized and better structured.
+        Resumes of at least settings.RESUME_SECTION_SPLIT_CHARS characters are regenerated
+        section by section in parallel.
 
         Returns:
             Dict with regenerated resume text and metadata.
         """
-        prompt = f"""You are an expert resume writer and ATS optimization specialist.
+        threshold = settings.RESUME_SECTION_SPLIT_CHARS
+        if threshold and len(resume_text) >= threshold:
+            sections = self._split_into_sections(resume_text)
+            # Splitting only pays off when there are several sections to rewrite
+            if len(sections) - (_PERSONAL_DETAILS in sections) >= 2:
+                return await self._generate_ats_optimized_resume_by_section(sections)
+
+        result, model_name = await self._generate_json(
+            _REGEN_PROMPT_TMPL.format(resume_text=resume_text),
+            _ATS_RESUME_CONFIG,
+            purpose=" for ATS resume generation",
+        )
+        return self._validate_ats_resume_result(result, model_name)
+
+    def generate_cover_letter_stream(self, resume_text: str, job_description: str) -> AsyncIterator[str]:
+        """
+        Stream a customized cover letter as plain text while Gemini generates it.
 
-Take the following resume content and regenerate it to:
-- Improve clarity, structure, and readability
-- Use standard ATS-friendly section headings (e.g., SUMMARY, EXPERIENCE, EDUCATION, SKILLS)
-- Avoid complex tables, columns, images, and graphics
--,Use bullet points where appropriate
-- Emphasize quantified achievements and relevant keywords
-- Keep the content truthful and do NOT invent new experience or companies
-- Preserve all important information from the original resume
+        Returns:
+            Async iterator of cover letter text chunks.
+        """
+        prompt = _COVER_STREAM_PROMPT_TMPL.format(resume_text=resume_text, job_description=job_description)
 
---- ORIGINAL RESUME ---
-{resume_text}
+        return self._stream_with_fallback(prompt, purpose=" for cover letter")
 
-Return your answer in the following JSON format ONLY:
-{{
-  "regenerated_resume": "<full regenerated resume in plain text, with clear section headings>",
-  "notes": "<brief explanation (2-4 bullet sentences) of the key improvements you made, or empty string>"
-}}"""
+    def generate_ats_optimized_resume_stream(self, resume_text: str) -> AsyncIterator[str]:
+        """
+        Stream the ATS-optimized resume as plain text while Gemini generates it.
 
-        # Try models until one works
-        response = None
-        last_error = None
+        Returns:
+            Async iterator of regenerated resume text chunks.
+        """
+        prompt = _REGEN_STREAM_PROMPT_TMPL.format(resume_text=resume_text)
 
-        for i in range(len(self.model_names)):
-            try:
-                if i > 0:
-                    self.model = genai.GenerativeModel(self.model_names[i])
-                    self.current_model_index = i
+        return self._stream_with_fallback(prompt, purpose=" for ATS resume generation")
 
-                response = self.model.generate_content(prompt)
-                break
-            except Exception as e:
-                last_error = e
-                if i == len(self.model_names) - 1:
-                    raise ValueError(
-                        f"Error calling Gemini API for ATS resume generation: {str(e)}. "
-                        f"Tried models: {', '.join(self.model_names)}. "
-                        f"Please check your API key permissions."
-                    )
-                continue
+    async def analyze_resumes_batch(
+        self, resume_texts: List[str], concurrency: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Analyze many resumes concurrently, one Gemini call each, with at most
+        `concurrency` calls in flight so provider rate limits are respected.
 
-        if response is None:
-            raise ValueError(f"Failed to get response from any Gemini model. Last error: {str(last_error)}")
+        Args:
+            resume_texts: Extracted resume texts
+            concurrency: Maximum concurrent Gemini calls (defaults to settings.GEMINI_MAX_CONCURRENCY)
 
+        Returns:
+            One analysis dict (or the exception raised for it) per resume, in order
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.GEMINI_MAX_CONCURRENCY)
+
+        async def analyze(resume_text: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_resume_for_ats_async(resume_text)
+
+        return await asyncio.gather(
+            *(analyze(resume_text) for resume_text in resume_texts), return_exceptions=True
+        )
+
+    async def analyze_resume_for_ats_batched(self, resume_text: str) -> Dict[str, Any]:
+        """
+        Analyze resume text like analyze_resume_for_ats_async, coalescing concurrent calls.
+        Resumes submitted within settings.ATS_BATCH_WINDOW_MS of each other (up to
+        settings.ATS_BATCH_MAX_SIZE) are scored together in a single Gemini call.
+
+        Args:
+            resume_text: Extracted text from resume file
+
+        Returns:
+            Dictionary containing score, feedback, strengths, weaknesses, and recommendations
+        """
+        if self._ats_batcher is None or self._ats_batcher.done():
+            self._ats_queue = asyncio.Queue()
+            if self._ats_batch_slots is None:  # Batches from a previous batcher may still hold slots
+                self._ats_batch_slots = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+            self._ats_batcher = asyncio.create_task(self._run_ats_batcher())
+
+        future = asyncio.get_running_loop().create_future()
+        self._ats_queue.put_nowait((resume_text, future))
+        return await future
+
+    async def _run_ats_batcher(self) -> None:
+        """Collect queued ATS analyses into batches and dispatch each one as its own task"""
+        window = settings.ATS_BATCH_WINDOW_MS / 1000
+        while True:
+            # Wait for the first resume, then give others a short window to join it
+            batch: List[Tuple[str, asyncio.Future]] = [await self._ats_queue.get()]
+            await asyncio.sleep(window)
+            # With every slot busy, requests keep queueing and the next batch fills up
+            await self._ats_batch_slots.acquire()
+            while len(batch) < settings.ATS_BATCH_MAX_SIZE and not self._ats_queue.empty():
+                batch.append(self._ats_queue.get_nowait())
+
+            # Don't wait for Gemini here, so several batches can be in flight at once
+            task = asyncio.create_task(self._resolve_batch(batch))
+            self._ats_batches.add(task)
+            task.add_done_callback(self._ats_batch_done)
+
+    def _ats_batch_done(self, task: asyncio.Task) -> None:
+        """Free the slot of a finished batch task"""
+        self._ats_batches.discard(task)
+        self._ats_batch_slots.release()
+
+    async def _resolve_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Score one batch of queued resumes and resolve their futures"""
         try:
-            if hasattr(response, "text"):
-                response_text = response.text.strip()
-            elif hasattr(response, "candidates") and response.candidates:
-                response_text = response.candidates[0].content.parts[0].text.strip()
+            results = await self._analyze_resume_batch([resume_text for resume_text, _ in batch])
+        except Exception as e:
+            # A fresh exception per caller, since raising mutates the instance
+            results = [ValueError(str(e)) for _ in batch]
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # The caller went away
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
             else:
-                response_text = str(response).strip()
+                future.set_result(result)
 
-            response_text = re.sub(r"```json\\s*", "", response_text)
-            response_text = re.sub(r"```\\s*", "", response_text)
-            response_text = response_text.strip()
+    async def _analyze_resume_batch(self, resume_texts: List[str]) -> List[Any]:
+        """
+        Analyze several resumes with one Gemini call
 
-            result = json.loads(response_text)
+        Args:
+            resume_texts: Extracted resume texts
 
-            regenerated_resume = result.get("regenerated_resume", "").strip()
-            if not regenerated_resume:
-                raise ValueError("Gemini response did not contain a regenerated_resume field.")
+        Returns:
+            One analysis dict (or the ValueError raised for it) per resume, in order
+        """
+        if len(resume_texts) == 1:
+            try:
+                return [await self.analyze_resume_for_ats_async(resume_texts[0])]
+            except ValueError as e:
+                return [e]
 
-            return {
-                "regenerated_resume": regenerated_resume,
-                "model_used": self.model_names[self.current_model_index],
-                "notes": result.get("notes") or "",
-            }
+        resumes = "\n\n".join(
+            f"=== RESUME {i} ===\n{resume_text}" for i, resume_text in enumerate(resume_texts, start=1)
+        )
+        prompt = _ATS_BATCH_PROMPT_TMPL.format(count=len(resume_texts), resumes=resumes)
 
-        except json.JSONDecodeError:
-            # Fallback: treat the whole response text as the regenerated resume
-            # This avoids failing the request if the model did not follow JSON instructions
-            return {
-                "regenerated_resume": response_text.strip(),
-                "model_used": self.model_names[self.current_model_index],
-                "notes": "Model returned non-JSON response; used raw text as regenerated resume.",
-            }
-        except Exception as e:
-            raise ValueError(f"Error processing Gemini ATS resume response: {str(e)}")
+        response, _ = await self._call_with_fallback(
+            prompt, purpose=" for batched ATS analysis", generation_config=_ATS_BATCH_CONFIG
+        )
 
+        try:
+            results = self._parse_json(response)
+            if not isinstance(results, list) or len(results) != len(resume_texts):
+                raise ValueError("Gemini returned a different number of analyses than resumes.")
+            return [self._normalize_ats_result(result) for result in results]
+        except Exception:
+            # The model did not follow the batch format; score each resume on its own
+            return await self.analyze_resumes_batch(resume_texts)
+
+    async def aclose(self) -> None:
+        """Stop the ATS batching task and any batches still in flight"""
+        tasks = list(self._ats_batches)
+        if self._ats_batcher is not None:
+            tasks.append(self._ats_batcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._ats_batcher = None
@@ -0,0 +1,64 @@
+import re
+
+
+MIN_RESUME_LENGTH = 200
+MIN_RESUME_HINTS = 2
+MIN_JOB_DESCRIPTION_WORDS = 5
+
+# Things nearly every resume contains: standard section headers, an email address or a phone number.
+# The phone branch only accepts phone-shaped numbers, so date ranges like "2019 - 2021" don't count:
+# an international number starting with "+" (+44 20 7946 0958, +1 (555) 123-4567), a bracketed
+# area code ((555) 123-4567), 3-3-4 digit groups (555-123-4567, 555.123.4567) or 10 bare digits
+_RESUME_HINT = re.compile(
+    r"(?P<section>\b(?:experience|education|skills|employment|projects|certifications?|summary|objective)\b)"
+    r"|(?P<email>[\w.+-]+@[\w-]+\.[\w.-]+)"
+    r"|(?P<phone>\+\d{1,3}[\s.-]?\(?\d{1,4}\)?(?:[\s.-]?\d{2,4}){2,4}\b"
+    r"|\(\d{3}\)\s*\d{3}[\s.-]?\d{4}\b"
+    r"|\b\d{3}[\s.-]\d{3}[\s.-]\d{4}\b"
+    r"|\b\d{10}\b)",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[^\W\d_]{2,}")
+
+
+def looks_like_resume(text: str) -> bool:
+    """
+    Cheap check that extracted text plausibly comes from a resume, so obviously wrong
+    files can be rejected without a Gemini call
+
+    Args:
+        text: Extracted file text
+
+    Returns:
+        True if the text is long enough and contains at least MIN_RESUME_HINTS distinct
+        resume hints (section headers, email, phone)
+    """
+    if len(text.strip()) < MIN_RESUME_LENGTH:
+        return False
+
+    hints = set()
+    for match in _RESUME_HINT.finditer(text):
+        section = match.group("section")
+        hints.add(section.lower() if section else match.lastgroup)
+        if len(hints) >= MIN_RESUME_HINTS:
+            return True
+    return False
+
+
+def looks_like_job_description(text: str) -> bool:
+    """
+    Cheap check that a job description is real prose rather than filler
+    (e.g. a repeated character or word padded past the minimum length)
+
+    Args:
+        text: Job description text
+
+    Returns:
+        True if the text contains at least MIN_JOB_DESCRIPTION_WORDS distinct words
+    """
+    words = set()
+    for match in _WORD.finditer(text):
+        words.add(match.group().lower())
+        if len(words) >= MIN_JOB_DESCRIPTION_WORDS:
+            return True
+    return False
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from cachetools import TTLCache
+from config import settings
+
+
+class LLMCache:
+    """In-process TTL cache for Gemini results keyed by request content"""
+
+    def __init__(
+        self,
+        maxsize: int = settings.LLM_CACHE_MAX,
+        ttl: float = settings.LLM_CACHE_TTL,
+        path: Optional[str] = settings.LLM_CACHE_PATH or None,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of cached results
+            ttl: Seconds a result stays valid
+            path: Optional JSON file used by load() and save() to keep results across restarts
+        """
+        self.ttl = ttl
+        self.path = path
+        # Values are stored as (expires_at, result) with a wall-clock expiry, so an
+        # entry keeps its original deadline across save() and load()
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(method_name: str, resume_text: str, job_description: Optional[str] = None) -> str:
+        """
+        Build a cache key for a Gemini call
+
+        Args:
+            method_name: Name of the GeminiService method, so different prompts never collide
+            resume_text: Extracted resume text
+            job_description: Optional job description sent along with the resume
+
+        Returns:
+            BLAKE2b hex digest of the method name and normalized inputs
+        """
+        payload = f"{method_name}|{resume_text.strip()}|{(job_description or '').strip()}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss"""
+        entry = self._cache.get(key)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result under key until it expires or is evicted"""
+        self._cache[key] = (time.time() + self.ttl, value)
+
+    def load(self) -> None:
+        """
+        Load results saved by save(), if a path is configured. Each entry keeps the
+        expiry it was stored with; entries that have already expired are skipped.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for key, (expires_at, value) in data.get("entries", {}).items():
+                if expires_at > now:
+                    self._cache[key] = (expires_at, value)
+        except (OSError, ValueError, TypeError):
+            # A missing or corrupt cache file only costs cache misses
+            return
+
+    def save(self) -> None:
+        """Write the live results to the configured path, if any"""
+        if not self.path:
+            return
+        self._cache.expire()
+        now = time.time()
+        entries = {key: entry for key, entry in self._cache.items() if entry[0] > now}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a truncated cache behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": now, "entries": entries}, f)
+        os.replace(tmp_path, self.path)
@@ -1,16 +1,50 @@
 import httpx
-from typing import Tuple
+import os
+from email.message import Message
+from typing import Optional, Tuple
+from urllib.parse import unquote, urlparse
 from app.utils.file_processor import FileProcessor
+from config import settings
 
 
 class URLDownloader:
     """Utility class for downloading files from URLs"""
     
     MAX_FILE_SIZE = FileProcessor.MAX_FILE_SIZE
-    TIMEOUT = 30.0  # 30 seconds timeout
+    TIMEOUT = settings.DOWNLOAD_TIMEOUT
+    CONNECT_TIMEOUT = settings.DOWNLOAD_CONNECT_TIMEOUT
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    KEEPALIVE_EXPIRY = 30.0  # Seconds an idle pooled connection is kept open
+    CHUNK_SIZE = 64 * 1024  # Read the response body 64KB at a time
     
-    @staticmethod
-    async def download_file(url: str) -> Tuple[bytes, str]:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        # Reusing one client keeps connections alive between downloads, so
+        # repeated requests to the same host skip the TCP/TLS handshake; HTTP/2
+        # lets concurrent downloads from one host share a single connection
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(URLDownloader.TIMEOUT, connect=URLDownloader.CONNECT_TIMEOUT),
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=URLDownloader.MAX_CONNECTIONS,
+                    max_keepalive_connections=URLDownloader.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=URLDownloader.KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def download_file(self, url: str) -> Tuple[bytes, str]:
         """
         Download a file from a URL and return its content and filename
         
@@ -24,60 +58,93 @@ class URLDownloader:
             ValueError: If download fails or file is invalid
         """
         try:
-            async with httpx.AsyncClient(timeout=URLDownloader.TIMEOUT) as client:
-                response = await client.get(url)
+            client = self._get_client()
+            async with client.stream("GET", url) as response:
                 response.raise_for_status()  # Raise exception for bad status codes
                 
                 # Get filename from URL or Content-Disposition header
                 filename = URLDownloader._extract_filename(url, response.headers)
                 
-                # Validate file size
-                content_length = response.headers.get('content-length')
-                if content_length and int(content_length) > URLDownloader.MAX_FILE_SIZE:
+                # Validate file extension before reading any of the body
+                if FileProcessor.classify(filename) is None:
                     raise ValueError(
-                        f"File size ({int(content_length) / (1024*1024):.2f}MB) exceeds "
-                        f"maximum allowed size of {URLDownloader.MAX_FILE_SIZE / (1024*1024)}MB"
+                        f"Invalid file type. Allowed types: {', '.join(FileProcessor.FILE_TYPES)}"
                     )
                 
-                file_content = response.content
-                
-                # Validate actual downloaded size
-                if len(file_content) > URLDownloader.MAX_FILE_SIZE:
-                    raise ValueError(
-                        f"File size ({len(file_content) / (1024*1024):.2f}MB) exceeds "
-                        f"maximum allowed size of {URLDownloader.MAX_FILE_SIZE / (1024*1024)}MB"
-                    )
-                
-                # Validate file extension
-                if not FileProcessor.is_valid_extension(filename):
-                    raise ValueError(
-                        f"Invalid file type. Allowed types: {', '.join(FileProcessor.ALLOWED_EXTENSIONS)}"
-                    )
+                # Reject early when the server already declares an oversized body
+                content_length = response.headers.get('content-length')
+                if content_length and int(content_length) > URLDownloader.MAX_FILE_SIZE:
+                    raise ValueError(URLDownloader._size_error_message(int(content_length)))
                 
-                return file_content, filename
+                # Read the body in chunks and stop as soon as it crosses the limit,
+                # so an oversized or lying response never lands in memory in full
+                buffer = bytearray()
+                file_type = None
+                async for chunk in response.aiter_bytes(URLDownloader.CHUNK_SIZE):
+                    buffer.extend(chunk)
+                    # Check the file signature once the first bytes are in, so a
+                    # mislabelled file is rejected without reading the rest of it
+                    if file_type is None and len(buffer) >= FileProcessor.SIGNATURE_LENGTH:
+                        file_type = URLDownloader._sniff_file_type(buffer)
+                    if len(buffer) > URLDownloader.MAX_FILE_SIZE:
+                        raise ValueError(URLDownloader._size_error_message(len(buffer)))
                 
+                if file_type is None:  # Body shorter than the longest signature
+                    file_type = URLDownloader._sniff_file_type(buffer)
+                file_content = bytes(buffer)
+            
+            # Name the file after its actual format, since the extension was only a guess
+            filename = os.path.splitext(filename)[0] + FileProcessor.EXTENSIONS[file_type]
+            
+            return file_content, filename
+            
         except httpx.HTTPStatusError as e:
-            raise ValueError(f"Failed to download file: HTTP {e.response.status_code} - {e.response.text}")
+            raise ValueError(
+                f"Failed to download file: HTTP {e.response.status_code} - {e.response.reason_phrase}"
+            )
         except httpx.TimeoutException:
             raise ValueError(f"Request timed out after {URLDownloader.TIMEOUT} seconds")
         except httpx.RequestError as e:
             raise ValueError(f"Failed to download file: {str(e)}")
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Unexpected error downloading file: {str(e)}")
     
+    @staticmethod
+    def _sniff_file_type(head: bytes) -> str:
+        """Get the file type from the leading bytes of a download, raising if it is not allowed"""
+        file_type = FileProcessor.sniff_file_type(head)
+        if file_type is None:
+            raise ValueError(
+                f"Invalid file type. File content is not one of: {', '.join(FileProcessor.FILE_TYPES)}"
+            )
+        return file_type
+    
+    @staticmethod
+    def _size_error_message(size: int) -> str:
+        """Build the error message for a file that exceeds MAX_FILE_SIZE"""
+        return (
+            f"File size ({size / (1024*1024):.2f}MB) exceeds "
+            f"maximum allowed size of {URLDownloader.MAX_FILE_SIZE / (1024*1024)}MB"
+        )
+    
     @staticmethod
     def _extract_filename(url: str, headers: dict) -> str:
         """Extract filename from URL or Content-Disposition header"""
-        # Try Content-Disposition header first
+        # Try Content-Disposition header first; the email parser handles quoting,
+        # extra parameters and RFC 2231 encoded names (filename*=UTF-8''...)
         content_disposition = headers.get('content-disposition', '')
-        if 'filename=' in content_disposition:
-            filename = content_disposition.split('filename=')[1].strip('"\'')
+        if content_disposition:
+            message = Message()
+            message['content-disposition'] = content_disposition
+            # Keep only the base name in case the server sent a path
+            filename = (message.get_filename() or '').replace('\\', '/').rsplit('/', 1)[-1]
             if filename:
                 return filename
         
-        # Fallback to URL path
-        url_path = url.split('?')[0]  # Remove query parameters
-        filename = url_path.split('/')[-1]
+        # Fallback to URL path (without query string or fragment)
+        filename = unquote(urlparse(url).path.rsplit('/', 1)[-1])
         
         # If no extension, try to infer from Content-Type
         if '.' not in filename:
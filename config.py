@@ -1,14 +1,71 @@
 import os
+from dataclasses import dataclass, field, fields
+from typing import Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _from_env(raw: str, default):
+    """Convert an environment variable to the type of the setting's default"""
+    if isinstance(default, bool):
+        return raw.lower() in ("1", "true", "yes")
+    if isinstance(default, tuple):
+        # Comma-separated list; empty items are dropped
+        return tuple(item.strip() for item in raw.split(",") if item.strip())
+    return type(default)(raw)
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
-    
-    @property
-    def is_gemini_configured(self) -> bool:
-        return bool(self.GEMINI_API_KEY)
+    """Application settings, read from the environment once at startup"""
+
+    GEMINI_API_KEY: str = field(default="", repr=False)  # Kept out of repr so logs never show it
+    # Abort startup instead of serving 500s when the Gemini service can't be created
+    FAIL_FAST_ON_MISSING_KEY: bool = False
+    # Maximum Gemini calls in flight for one bulk analysis
+    GEMINI_MAX_CONCURRENCY: int = 5
+    # Attempts per model on transient Gemini errors (rate limits, 5xx, timeouts), with
+    # jittered exponential backoff between INITIAL_WAIT and MAX_WAIT seconds
+    GEMINI_RETRY_ATTEMPTS: int = 3
+    GEMINI_RETRY_INITIAL_WAIT: float = 1.0
+    GEMINI_RETRY_MAX_WAIT: float = 10.0
+    # Gemini result cache: size, lifetime in seconds, and an optional JSON file
+    # (e.g. data/llm_cache.json) it is loaded from at startup and saved to at shutdown
+    LLM_CACHE_MAX: int = 1024
+    LLM_CACHE_TTL: int = 86400
+    LLM_CACHE_PATH: str = ""
+    # Extracted resume text cache, so a resume sent to several endpoints is parsed once
+    RESUME_TEXT_CACHE_MAX: int = 1024
+    RESUME_TEXT_CACHE_TTL: int = 3600
+    # Coalesce ATS analyses arriving within this many milliseconds into one
+    # Gemini call (0 disables batching)
+    ATS_BATCH_WINDOW_MS: int = 0
+    ATS_BATCH_MAX_SIZE: int = 8
+    # Resumes at least this many characters long are regenerated section by section,
+    # with one Gemini call per section in parallel (0 disables splitting)
+    RESUME_SECTION_SPLIT_CHARS: int = 6000
+    # Timeouts in seconds for downloading resumes from URLs
+    DOWNLOAD_TIMEOUT: float = 30.0
+    DOWNLOAD_CONNECT_TIMEOUT: float = 5.0
+    # Origins allowed by CORS; empty disables the CORS middleware when a reverse
+    # proxy adds the headers instead
+    CORS_ORIGINS: Tuple[str, ...] = ("*",)
+    # Derived from GEMINI_API_KEY once instead of on every access
+    is_gemini_configured: bool = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "is_gemini_configured", bool(self.GEMINI_API_KEY))
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from the environment variable of the same name, where set"""
+        overrides = {
+            f.name: _from_env(os.environ[f.name], f.default)
+            for f in fields(cls)
+            if f.init and f.name in os.environ
+        }
+        return cls(**overrides)
 
-settings = Settings()
 
+settings = Settings.from_env()